@@ -18,12 +18,12 @@
 """ Expose package-wide elements. """
 
 import logging
+import re
 import sys
+from functools import lru_cache
 from operator import methodcaller
 from pathlib import Path
-
-from boltons.ecoutils import get_profile
-from boltons.iterutils import unique
+from types import MappingProxyType
 
 # Canonical name of the CLI.
 CLI_NAME = "mdedup"
@@ -31,8 +31,16 @@ CLI_NAME = "mdedup"
 __version__ = "6.2.1"
 
 
-# Environment data.
-env_data = get_profile(scrub=True)
+@lru_cache(maxsize=1)
+def env_data():
+    """Environment data.
+
+    Profiling the environment is expensive and only needed to print the version, so
+    it is collected on first call only.
+    """
+    from boltons.ecoutils import get_profile
+
+    return get_profile(scrub=True)
 
 
 # Initialize global logger.
@@ -66,6 +74,33 @@ HASH_HEADERS = (
 )
 
 
+@lru_cache(maxsize=256)
+def normalize_header_id(header_id):
+    """Normalize a header ID of the configuration.
+
+    Headers are case-insensitive in Python implementation. Normalized header IDs are
+    cached and interned to be shared and compared by identity. Headers of mails are
+    not normalized through here, as the lookup costs more than lowercasing them.
+    """
+    return sys.intern(header_id.lower())
+
+
+# Normalize the default set once at import time so the default configuration can
+# skip it entirely.
+_DEFAULT_NORMALIZED_HEADERS = tuple(
+    dict.fromkeys(map(normalize_header_id, HASH_HEADERS))
+)
+
+# Same normalized default headers, for constant-time membership tests.
+HASH_HEADERS_SET = frozenset(_DEFAULT_NORMALIZED_HEADERS)
+
+
+# Mail headers are composed of ASCII characters between 33 and 126 (both
+# inclusive) according the RFC-5322. Anything else is to be deleted by
+# bytes.translate() to detect invalid header IDs.
+_INVALID_HEADER_BYTES = bytes(b for b in range(256) if b < 33 or b > 126)
+
+
 # Below this value, we consider not having enough data to compute a solid hash.
 MINIMAL_HEADERS_COUNT = 4
 
@@ -84,15 +119,20 @@ MINIMAL_HEADERS_COUNT = 4
 DEFAULT_SIZE_THRESHOLD = 512  # bytes
 
 
-# Similarly, we generated unified diffs of duplicates and ensure that the diff
-# is not greater than a certain size.
-DEFAULT_CONTENT_THRESHOLD = 768  # bytes
+# Similarly, we compute the edit distance between the bodies of duplicates and
+# ensure that it is not greater than a certain number of characters.
+DEFAULT_CONTENT_THRESHOLD = 768  # characters
+
+
+# Mails are hashed in the main process by default, as spawning worker processes
+# only pays off on large folder-based boxes and multiple cores.
+DEFAULT_JOBS = 1
 
 
 # Sources from which we compute a mail's canonical timestamp.
-DATE_HEADER = "date-header"
-CTIME = "ctime"
-TIME_SOURCES = frozenset([DATE_HEADER, CTIME])
+DATE_HEADER = sys.intern("date-header")
+CTIME = sys.intern("ctime")
+TIME_SOURCES = frozenset({DATE_HEADER, CTIME})
 
 
 class TooFewHeaders(Exception):
@@ -114,53 +154,100 @@ class Config:
 
     """ Holds global configuration. """
 
-    # Keep these defaults in sync with CLI option definitions.
-    default_conf = {
-        "dry_run": False,
-        "input_format": False,
-        "force_unlock": False,
-        "hash_only": False,
-        "hash_headers": HASH_HEADERS,
-        "hash_body": None,
-        "size_threshold": DEFAULT_SIZE_THRESHOLD,
-        "content_threshold": DEFAULT_CONTENT_THRESHOLD,
-        "show_diff": False,
-        "strategy": None,
-        "time_source": None,
-        "regexp": None,
-        "action": None,
-        "export": None,
-        "export_format": "mbox",
-        "export_append": False,
-    }
+    # Keep these defaults in sync with CLI option definitions. Read-only and shared
+    # by all instances.
+    default_conf = MappingProxyType(
+        {
+            "dry_run": False,
+            "input_format": False,
+            "force_unlock": False,
+            "recursive": True,
+            "hash_only": False,
+            "hash_headers": _DEFAULT_NORMALIZED_HEADERS,
+            "hash_body": "skip",
+            "size_threshold": DEFAULT_SIZE_THRESHOLD,
+            "content_threshold": DEFAULT_CONTENT_THRESHOLD,
+            "show_diff": False,
+            "strategy": None,
+            "time_source": DATE_HEADER,
+            "regexp": None,
+            "action": None,
+            "export": None,
+            "export_format": "mbox",
+            "export_append": False,
+            "jobs": DEFAULT_JOBS,
+            "cache_path": None,
+        }
+    )
+
+    # Configuration entries are exposed as plain attributes.
+    __slots__ = tuple(default_conf) + ("hash_headers_set",)
 
     def __init__(self, **kwargs):
         """ Validates configuration parameter types and values. """
-        # Load default values.
-        self.conf = self.default_conf.copy()
-
         unrecognized_options = set(kwargs) - set(self.default_conf)
         if unrecognized_options:
             raise ValueError(f"Unrecognized {unrecognized_options} options.")
 
-        # Replace defaults values with our config.
-        self.conf.update(kwargs)
+        # Replace defaults values with our config. Entries are assigned one by one
+        # for static analysis tools to know about them.
+        conf = {**self.default_conf, **kwargs}
+        self.dry_run = conf["dry_run"]
+        self.input_format = conf["input_format"]
+        self.force_unlock = conf["force_unlock"]
+        self.recursive = conf["recursive"]
+        self.hash_only = conf["hash_only"]
+        self.hash_headers = conf["hash_headers"]
+        self.hash_body = conf["hash_body"]
+        self.size_threshold = conf["size_threshold"]
+        self.content_threshold = conf["content_threshold"]
+        self.show_diff = conf["show_diff"]
+        self.strategy = conf["strategy"]
+        self.time_source = conf["time_source"]
+        self.regexp = conf["regexp"]
+        self.action = conf["action"]
+        self.export = conf["export"]
+        self.export_format = conf["export_format"]
+        self.export_append = conf["export_append"]
+        self.jobs = conf["jobs"]
+        self.cache_path = conf["cache_path"]
 
         # Check thresholds.
         assert self.size_threshold >= -1
         assert self.content_threshold >= -1
 
-        # Headers are case-insensitive in Python implementation.
-        normalized_headers = [h.lower() for h in self.hash_headers]
-        # Remove duplicate entries.
-        normalized_headers = unique(normalized_headers)
-        # Mail headers are composed of ASCII characters between 33 and 126
-        # (both inclusive) according the RFC-5322.
-        for hid in normalized_headers:
-            ascii_indexes = set(map(ord, hid))
-            assert max(ascii_indexes) <= 126
-            assert min(ascii_indexes) >= 33
-        self.hash_headers = tuple(normalized_headers)
+        # Check parallelism.
+        assert self.jobs >= 1
+
+        # Check time source. Falls back to the Date header if unset.
+        if self.time_source is None:
+            self.time_source = DATE_HEADER
+        assert self.time_source in TIME_SOURCES
+
+        # Default headers are already normalized. The CLI passes its own copy of them.
+        if self.hash_headers is _DEFAULT_NORMALIZED_HEADERS or (
+            isinstance(self.hash_headers, tuple) and self.hash_headers == HASH_HEADERS
+        ):
+            self.hash_headers = _DEFAULT_NORMALIZED_HEADERS
+            self.hash_headers_set = HASH_HEADERS_SET
+        else:
+            # Remove duplicate entries while preserving order.
+            normalized_headers = dict.fromkeys(
+                map(normalize_header_id, self.hash_headers)
+            )
+            for hid in normalized_headers:
+                # Raises UnicodeEncodeError, a ValueError, on non-ASCII characters.
+                encoded_hid = hid.encode("ascii")
+                if not encoded_hid or (
+                    encoded_hid.translate(None, _INVALID_HEADER_BYTES) != encoded_hid
+                ):
+                    raise ValueError(f"Invalid {hid!r} header ID.")
+            self.hash_headers = tuple(normalized_headers)
+            self.hash_headers_set = frozenset(self.hash_headers)
+
+        # Compile regular expression once for all mails.
+        if isinstance(self.regexp, str):
+            self.regexp = re.compile(self.regexp)
 
         # Export mail box will always be created from scratch and is not
         # expected to exists in the first place.
@@ -169,7 +256,5 @@ class Config:
             if self.export.exists() and self.export_append is not True:
                 raise FileExistsError(self.export)
 
-    def __getattr__(self, attr_id):
-        """ Expose configuration entries as properties. """
-        if attr_id in self.conf:
-            return self.conf[attr_id]
+        if self.cache_path:
+            self.cache_path = Path(self.cache_path).resolve()
@@ -45,6 +45,7 @@ def __copy_mails(dedup, mails):
         if dedup.conf.dry_run:
             logger.warning("DRY RUN: Skip action.")
         else:
+            mail.load_body()
             box.add(mail)
             logger.info(f"{mail!r} copied.")
 
@@ -66,6 +67,7 @@ def __move_mails(dedup, mails):
         if dedup.conf.dry_run:
             logger.warning("DRY RUN: Skip action.")
         else:
+            mail.load_body()
             box.add(mail)
             dedup.sources[mail.source_path].remove(mail.mail_id)
             logger.info(f"{mail!r} copied.")
@@ -0,0 +1,91 @@
+# Copyright Kevin Deldycke <kevin@deldycke.com> and contributors.
+# All Rights Reserved.
+#
+# This program is Free Software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+""" Persistent cache of mail hashes between runs. """
+
+import os
+import sqlite3
+from pathlib import Path
+
+from . import __version__, logger
+
+
+class Cache:
+
+    """Store computed hashes of mails in a SQLite database.
+
+    Entries are keyed by the location of the mail and are only valid as long as the
+    size and modification time of the mail file are unchanged, and the hashes were
+    produced with the same hashing configuration.
+    """
+
+    def __init__(self, path, conf):
+        """Open the database, and create its schema on first use."""
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        logger.info(f"Opening hash cache {self.path} ...")
+
+        # Hashes depend on the headers and body hasher used to compute them, and on
+        # the normalization rules of the release which produced them.
+        self.conf_key = f"{__version__}:{conf.hash_body}:{' '.join(conf.hash_headers)}"
+
+        self.db = sqlite3.connect(str(self.path))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "path TEXT, mail_id TEXT, size INTEGER, mtime INTEGER, conf TEXT, "
+            "hash TEXT, PRIMARY KEY (path, mail_id)) WITHOUT ROWID"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @staticmethod
+    def key(path, mail_id):
+        """Returns the key of a mail, as found on the filesystem right now.
+
+        ``path`` is the file in which the mail is stored. Which is the whole box for
+        file-based boxes, hence the ``mail_id`` to tell mails apart.
+        """
+        stat = os.stat(path)
+        return str(path), str(mail_id), stat.st_size, stat.st_mtime_ns
+
+    def get(self, key):
+        """Returns the cached hash of a mail, or ``None`` if missing or stale."""
+        row = self.db.execute(
+            "SELECT hash FROM hashes "
+            "WHERE path=? AND mail_id=? AND size=? AND mtime=? AND conf=?",
+            key + (self.conf_key,),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, mail_hash):
+        """Store the hash of a mail, replacing any previous entry."""
+        self.db.execute(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)",
+            key + (self.conf_key, mail_hash),
+        )
+
+    def close(self):
+        """Persist all new entries and close the database."""
+        logger.debug(f"Close {self.path}")
+        self.db.commit()
+        self.db.close()
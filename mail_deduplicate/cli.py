@@ -20,12 +20,12 @@ import re
 
 import click
 import click_log
-from click_help_colors import version_option
 
 from . import (
     CLI_NAME,
     DATE_HEADER,
     DEFAULT_CONTENT_THRESHOLD,
+    DEFAULT_JOBS,
     DEFAULT_SIZE_THRESHOLD,
     HASH_HEADERS,
     TIME_SOURCES,
@@ -68,6 +68,24 @@ from .strategy import (
 click_log.basic_config(logger)
 
 
+def print_version(ctx, param, value):
+    """Print version and environment data, then exit.
+
+    Environment data is only collected here, as profiling the system is too
+    expensive to be done on each CLI invocation.
+    """
+    if not value or ctx.resilient_parsing:
+        return
+    click.echo(
+        click.style(CLI_NAME, **colors["cli"])
+        + " "
+        + click.style(__version__, fg="green")
+        + click.style(f"\n{env_data()}", fg="bright_black"),
+        color=ctx.color,
+    )
+    ctx.exit()
+
+
 def validate_regexp(ctx, param, value):
     """ Validate and compile regular expression. """
     if value:
@@ -106,6 +124,12 @@ def validate_regexp(ctx, param, value):
     default=False,
     help="Remove the lock on mail source opening if one is found.",
 )
+@click.option(
+    "--recursive/--no-recursive",
+    default=True,
+    help="Browse subfolders of mail sources. Includes Maildir++ subfolders and "
+    "maildirs nested in regular folders. Defaults to recursive.",
+)
 @click.option(
     "-H",
     "--hash-only",
@@ -139,6 +163,25 @@ def validate_regexp(ctx, param, value):
     f"{BODY_HASHER_NORMALIZED} use a cleaned body: remove all line breaks and spaces "
     "before computing body hash (slowest).",
 )
+@click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=1),
+    metavar="N",
+    default=DEFAULT_JOBS,
+    help="Number of worker processes used to compute hashes in parallel. Only mails "
+    "from folder-based boxes (maildir, mh) are hashed by workers, as file-based "
+    f"ones would be parsed again by each of them. Defaults to {DEFAULT_JOBS}, which "
+    "computes all hashes in the main process.",
+)
+@click.option(
+    "--cache-path",
+    metavar="FILE",
+    type=click.Path(dir_okay=False, resolve_path=True),
+    help="SQLite database in which mail hashes are persisted between runs. Hashes of "
+    "mails whose file size and modification time are unchanged since a previous run "
+    "are fetched from it instead of being recomputed. Not used by default.",
+)
 @click.option(
     "-S",
     "--size-threshold",
@@ -156,14 +199,15 @@ def validate_regexp(ctx, param, value):
     "-C",
     "--content-threshold",
     type=int,
-    metavar="BYTES",
+    metavar="CHARS",
     default=DEFAULT_CONTENT_THRESHOLD,
-    help="Maximum difference allowed in content between mails sharing the same hash. "
+    help="Maximum difference allowed in content between mails sharing the same hash, "
+    "measured as the edit distance between their bodies, in characters. "
     "The whole subset of duplicates will be skipped if at least one pair of mail "
     "exceeds the threshold. Set to 0 to enforce strictness and apply selection strategy "
     "on the subset only if all mails are exactly the same. Set to -1 to allow any "
     "difference and apply the strategy whatever the differences. Defaults to "
-    f"{DEFAULT_CONTENT_THRESHOLD} bytes.",
+    f"{DEFAULT_CONTENT_THRESHOLD} characters.",
 )
 @click.option(
     "-d",
@@ -253,13 +297,13 @@ def validate_regexp(ctx, param, value):
     ),
     help="Either CRITICAL, ERROR, WARNING, INFO or DEBUG. Defaults to INFO.",
 )
-@version_option(
-    version=__version__,
-    prog_name=CLI_NAME,
-    version_color="green",
-    prog_name_color=colors["cli"]["fg"],
-    message=f"%(prog)s %(version)s\n{env_data}",
-    message_color="bright_black",
+@click.option(
+    "--version",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=print_version,
+    help="Show the version and exit.",
 )
 @click.pass_context
 def mdedup(
@@ -267,9 +311,12 @@ def mdedup(
     dry_run,
     input_format,
     force_unlock,
+    recursive,
     hash_only,
     hash_header,
     hash_body,
+    jobs,
+    cache_path,
     size_threshold,
     content_threshold,
     show_diff,
@@ -376,9 +423,12 @@ def mdedup(
         dry_run=dry_run,
         input_format=input_format,
         force_unlock=force_unlock,
+        recursive=recursive,
         hash_only=hash_only,
         hash_headers=hash_header,
         hash_body=hash_body,
+        jobs=jobs,
+        cache_path=cache_path,
         size_threshold=size_threshold,
         content_threshold=content_threshold,
         show_diff=show_diff,
@@ -17,19 +17,25 @@
 
 import textwrap
 from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from difflib import unified_diff
-from itertools import combinations
+from functools import lru_cache, partial
+from itertools import chain, combinations, repeat
 from operator import attrgetter
 from pathlib import Path
 
 import click
 from boltons.cacheutils import cachedproperty
 from boltons.dictutils import FrozenDict
+from rapidfuzz.distance import Levenshtein
 from tabulate import tabulate
 
 from . import ContentDiffAboveThreshold, SizeDiffAboveThreshold, TooFewHeaders, logger
 from .colorize import choice_style, subtitle_style
-from .mailbox import open_box
+from .cache import Cache
+from .mail import get_mail_path, load_mail
+from .mailbox import BOX_STRUCTURES, BOX_TYPES, open_box
 from .strategy import apply_strategy
 
 # Reference all tracked statistics and their definition.
@@ -41,6 +47,10 @@ STATS_DEF = OrderedDict(
             "Number of mails rejected individually because they were unparseable or "
             "did not have enough metadata to compute hashes.",
         ),
+        (
+            "mail_cached",
+            "Number of mails whose hash was fetched from the cache of previous runs.",
+        ),
         (
             "mail_retained",
             "Number of valid mails parsed and retained for deduplication.",
@@ -122,6 +132,40 @@ BODY_HASHERS = FrozenDict(
 )
 
 
+@lru_cache(maxsize=None)
+def open_worker_box(box_type, box_path):
+    """Open a box in a worker process.
+
+    Boxes are opened once per process and kept around for the subsequent chunks of
+    mails. They are never locked as workers only reads from them.
+    """
+    return BOX_TYPES[box_type](box_path)
+
+
+def hash_mails(conf, box_type, box_path, mail_ids):
+    """Compute the hashes of a chunk of mails from the same box.
+
+    Runs in worker processes. Mails are loaded from their box by the worker itself,
+    so only IDs and hashes are sent across process boundaries. Bodies are not loaded
+    if not hashed.
+
+    Returns a list of mail IDs paired with their hash. Mails without enough headers
+    are paired with their ``TooFewHeaders`` exception instead.
+    """
+    box = open_worker_box(box_type, box_path)
+    body_hasher = BODY_HASHERS[conf.hash_body]
+    headers_only = conf.hash_body == BODY_HASHER_SKIP
+    hashes = []
+    for mail_id in mail_ids:
+        mail = load_mail(box, mail_id, headers_only)
+        mail.conf = conf
+        try:
+            hashes.append((mail_id, mail.hash_key + body_hasher(mail)))
+        except TooFewHeaders as expt:
+            hashes.append((mail_id, expt))
+    return hashes
+
+
 class DuplicateSet:
 
     """A duplicate set of mails sharing the same hash.
@@ -200,49 +244,64 @@ class DuplicateSet:
         if self.conf.size_threshold < 0 and self.conf.content_threshold < 0:
             return
 
-        # Compute differences of mail against one another.
-        for mail_a, mail_b in combinations(self.pool, 2):
+        # No need to compare all mails on size: if the biggest and smallest are
+        # within the threshold, all other pairs are.
+        size_difference = self.biggest_size - self.smallest_size
+        if self.conf.size_threshold > -1:
+            logger.debug(f"Mails differs by up to {size_difference} bytes in size.")
+            if size_difference > self.conf.size_threshold:
+                raise SizeDiffAboveThreshold
 
-            # Compare mails on size.
-            if self.conf.size_threshold > -1:
-                size_difference = abs(mail_a.size - mail_b.size)
-                logger.debug(
-                    f"{mail_a!r} and {mail_b!r} differs by {size_difference} bytes "
-                    "in size."
-                )
-                if size_difference > self.conf.size_threshold:
-                    raise SizeDiffAboveThreshold
-
-            # Compare mails on content.
-            if self.conf.content_threshold > -1:
-                content_difference = self.diff(mail_a, mail_b)
-                logger.debug(
-                    f"{mail_a!r} and {mail_b!r} differs by {content_difference} bytes "
-                    "in content."
-                )
-                if content_difference > self.conf.content_threshold:
-                    if self.conf.show_diff:
-                        logger.info(self.pretty_diff(mail_a, mail_b))
-                    raise ContentDiffAboveThreshold
+        if self.conf.content_threshold < 0:
+            return
 
-    def diff(self, mail_a, mail_b):
-        # TODO: rewrite the diff algorithm to not rely on naive unified diff
-        # result parsing.
-        """Return difference in bytes between two mails' normalized body."""
-        return len(
-            "".join(
-                unified_diff(
-                    mail_a.body_lines,
-                    mail_b.body_lines,
-                    # Ignore difference in filename lengths and timestamps.
-                    fromfile="a",
-                    tofile="b",
-                    fromfiledate="",
-                    tofiledate="",
-                    n=0,
-                    lineterm="\n",
-                )
+        # The edit distance between two bodies is at least their size difference, so
+        # there is no need to compute any if the sizes are too far apart.
+        if size_difference > self.conf.content_threshold:
+            logger.debug(
+                f"Mails differs by at least {size_difference} characters in content."
+            )
+            if self.conf.show_diff:
+                mail_a = max(self.pool, key=attrgetter("size"))
+                mail_b = min(self.pool, key=attrgetter("size"))
+                logger.info(self.pretty_diff(mail_a, mail_b))
+            raise ContentDiffAboveThreshold
+
+        # Mails with identical bodies have no differences, so only one of each
+        # distinct body needs to be compared. Mails are first grouped by body
+        # fingerprint, then only compared in full within each group.
+        fingerprints = {}
+        for mail in self.pool:
+            similar_mails = fingerprints.setdefault(mail.body_fingerprint, [])
+            if not any(mail.body_lines == other.body_lines for other in similar_mails):
+                similar_mails.append(mail)
+        distinct_mails = list(chain.from_iterable(fingerprints.values()))
+        logger.debug(f"{len(distinct_mails)} distinct bodies found.")
+
+        # Compare mails on content against one another.
+        for mail_a, mail_b in combinations(distinct_mails, 2):
+            content_difference = self.diff(mail_a, mail_b)
+            logger.debug(
+                f"{mail_a!r} and {mail_b!r} differs by {content_difference} characters "
+                "in content."
             )
+            if content_difference > self.conf.content_threshold:
+                if self.conf.show_diff:
+                    logger.info(self.pretty_diff(mail_a, mail_b))
+                raise ContentDiffAboveThreshold
+
+    def diff(self, mail_a, mail_b):
+        """Return difference in characters between two mails' normalized body.
+
+        The difference is the edit distance between the two decoded bodies, i.e. the
+        number of code points to insert, delete or substitute. Its computation is cut
+        short as soon as it exceeds the content threshold, in which case the
+        threshold plus one is returned.
+        """
+        return Levenshtein.distance(
+            "".join(mail_a.body_lines),
+            "".join(mail_b.body_lines),
+            score_cutoff=self.conf.content_threshold,
         )
 
     def pretty_diff(self, mail_a, mail_b):
@@ -353,6 +412,21 @@ class Deduplicate:
         # Deduplication statistics.
         self.stats = Counter(dict.fromkeys(STATS_DEF, 0))
 
+    @cachedproperty
+    def headers_only(self):
+        """Returns ``True`` if mails can be loaded without their body.
+
+        Bodies are only required to compute body hashes or to check differences of
+        duplicates against the thresholds. Else, they are left to be loaded on
+        demand.
+        """
+        return (
+            self.conf.hash_body == BODY_HASHER_SKIP
+            and self.conf.size_threshold < 0
+            and self.conf.content_threshold < 0
+            and not self.conf.show_diff
+        )
+
     def add_source(self, source_path):
         """Registers a source of mails, validates and opens it. """
         # Make the path absolute, resolving any symlinks. Do not allow duplicates in
@@ -364,7 +438,12 @@ class Deduplicate:
 
         # Open and register the mail source. Subfolders will be registered as their
         # own box.
-        boxes = open_box(source_path, self.conf.input_format, self.conf.force_unlock)
+        boxes = open_box(
+            source_path,
+            self.conf.input_format,
+            self.conf.force_unlock,
+            self.conf.recursive,
+        )
         for box in boxes:
             self.sources[box._path] = box
 
@@ -373,6 +452,74 @@ class Deduplicate:
             logger.info(f"{mail_found} mails found.")
             self.stats["mail_found"] += mail_found
 
+    def iter_hashes(self, box, body_hasher, executor=None, cache=None):
+        """Yields each mail of a box and its hash.
+
+        Hashes found in the ``cache`` are reused. Others are computed, and then stored
+        in the ``cache``. If an ``executor`` is provided, these are computed in
+        parallel by its worker processes, while mails are loaded in the main process.
+
+        Workers re-open the box on their own. For file-based boxes, this means parsing
+        the whole file again in each worker, so only mails from folder-based boxes are
+        hashed in parallel.
+
+        Mails without enough headers are yielded alongside their ``TooFewHeaders``
+        exception instead of a hash.
+        """
+        mail_ids = box.keys()
+        box_type = type(box).__name__.lower()
+        if box_type not in BOX_STRUCTURES["folder"]:
+            executor = None
+
+        # Fetch hashes computed in previous runs. Keep the path of each mail around
+        # to not look it up again on loading.
+        mail_paths = {}
+        cache_keys = {}
+        cached_hashes = {}
+        if cache:
+            for mail_id in mail_ids:
+                mail_paths[mail_id] = get_mail_path(box, mail_id)
+                cache_keys[mail_id] = cache.key(mail_paths[mail_id], mail_id)
+                mail_hash = cache.get(cache_keys[mail_id])
+                if mail_hash:
+                    cached_hashes[mail_id] = mail_hash
+            logger.info(f"{len(cached_hashes)} hashes fetched from cache.")
+            self.stats["mail_cached"] += len(cached_hashes)
+
+        for mail_id, mail_hash in cached_hashes.items():
+            mail = load_mail(box, mail_id, self.headers_only, mail_paths[mail_id])
+            mail.conf = self.conf
+            yield mail, mail_hash
+
+        # Missing hashes are computed by workers if any, or in the main process.
+        missing_ids = [i for i in mail_ids if i not in cached_hashes]
+        fresh_hashes = zip(missing_ids, repeat(None))
+        if executor and missing_ids:
+            # Split mails in chunks to amortize the cost of inter-process
+            # communication.
+            chunksize = max(1, len(missing_ids) // (self.conf.jobs * 4))
+            chunks = [
+                missing_ids[i : i + chunksize]
+                for i in range(0, len(missing_ids), chunksize)
+            ]
+            hasher = partial(hash_mails, self.conf, box_type, box._path)
+            fresh_hashes = chain.from_iterable(executor.map(hasher, chunks))
+
+        for mail_id, mail_hash in fresh_hashes:
+            mail = load_mail(box, mail_id, self.headers_only, mail_paths.get(mail_id))
+            mail.conf = self.conf
+
+            if mail_hash is None:
+                try:
+                    mail_hash = mail.hash_key + body_hasher(mail)
+                except TooFewHeaders as expt:
+                    mail_hash = expt
+
+            if cache and not isinstance(mail_hash, TooFewHeaders):
+                cache.set(cache_keys[mail_id], mail_hash)
+
+            yield mail, mail_hash
+
     def hash_all(self):
         """Browse all mails from all registered sources, compute hashes and group mails
         by hash.
@@ -390,23 +537,38 @@ class Deduplicate:
                 f"{self.conf.hash_body} body hasher not implemented yet."
             )
 
-        with click.progressbar(
-            length=self.stats["mail_found"],
-            label="Hashed mails",
-            show_pos=True,
-        ) as progress:
-
-            for box in self.sources.values():
-                for mail_id, mail in box.iteritems():
+        with ExitStack() as stack:
 
-                    mail.add_box_metadata(box, mail_id)
+            executor = None
+            if self.conf.jobs > 1:
+                logger.info(
+                    f"Spawn {self.conf.jobs} worker processes to hash mails from "
+                    "folder-based boxes."
+                )
+                executor = stack.enter_context(ProcessPoolExecutor(self.conf.jobs))
+
+            cache = None
+            if self.conf.cache_path:
+                cache = stack.enter_context(Cache(self.conf.cache_path, self.conf))
+
+            # Only redraw the progress bar every 0.1% of mails, as rendering it on
+            # each update is costly with millions of mails.
+            progress = stack.enter_context(
+                click.progressbar(
+                    length=self.stats["mail_found"],
+                    label="Hashed mails",
+                    show_pos=True,
+                    update_min_steps=max(1, self.stats["mail_found"] // 1000),
+                )
+            )
 
-                    mail.conf = self.conf
+            for box in self.sources.values():
+                for mail, mail_hash in self.iter_hashes(
+                    box, body_hasher, executor, cache
+                ):
 
-                    try:
-                        mail_hash = mail.hash_key + body_hasher(mail)
-                    except TooFewHeaders as expt:
-                        logger.warning(f"Rejecting {mail!r}: {expt.args[0]}")
+                    if isinstance(mail_hash, TooFewHeaders):
+                        logger.warning(f"Rejecting {mail!r}: {mail_hash.args[0]}")
                         self.stats["mail_rejected"] += 1
                     else:
                         # Use a set to deduplicate entries pointing to the same file.
@@ -415,6 +577,10 @@ class Deduplicate:
 
                     progress.update(1)
 
+            # Draw the steps left over after the last redraw.
+            progress.update_min_steps = 1
+            progress.update(0)
+
         self.stats["mail_hashes"] += len(self.mails)
 
     def build_sets(self):
@@ -491,6 +657,7 @@ class Deduplicate:
         # Box opening stats.
         assert self.stats["mail_found"] >= self.stats["mail_rejected"]
         assert self.stats["mail_found"] >= self.stats["mail_retained"]
+        assert self.stats["mail_found"] >= self.stats["mail_cached"]
         assert self.stats["mail_found"] == (
             self.stats["mail_rejected"] + self.stats["mail_retained"]
         )
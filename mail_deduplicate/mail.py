@@ -24,10 +24,72 @@ import re
 import time
 
 import arrow
+import xxhash
 from boltons.cacheutils import cachedproperty
+from boltons.dictutils import FrozenDict
 from tabulate import tabulate
 
-from . import CTIME, MINIMAL_HEADERS_COUNT, TooFewHeaders, logger
+from . import (
+    CTIME,
+    DATE_HEADER,
+    MINIMAL_HEADERS_COUNT,
+    TIME_SOURCES,
+    TooFewHeaders,
+    logger,
+)
+
+# Size in bytes of the BLAKE2b digests used to fingerprint mails.
+HASH_DIGEST_SIZE = 16
+
+
+# Header lines, as recognized by Python's email parser. Any other line, including
+# empty ones, starts the body.
+HEADER_LINE = re.compile(rb"^(From |[\041-\071\073-\176]*:|[\t ])")
+
+
+def get_mail_path(box, mail_id):
+    """Returns the real filesystem location of a mail.
+
+    That's the individual mail's file for folder-based box types (maildir & co.), but
+    the whole box path for file-based boxes (mbox & co.).
+    """
+    # Extract file name and close it right away to reclaim memory.
+    mail_file = box.get_file(mail_id)
+    path = mail_file._file.name
+    mail_file.close()
+    return path
+
+
+def read_headers(box, mail_id):
+    """Returns the raw headers of a mail.
+
+    Stops reading the mail at the first line not being part of headers, so its body
+    is never loaded.
+    """
+    lines = []
+    mail_file = box.get_file(mail_id)
+    for line in mail_file:
+        if not HEADER_LINE.match(line):
+            break
+        lines.append(line)
+    mail_file.close()
+    return b"".join(lines)
+
+
+def load_mail(box, mail_id, headers_only=False, path=None):
+    """Load a mail from its box, and attach its box metadata.
+
+    If ``headers_only`` is set, only headers of the mail are parsed. Its body is left
+    to be loaded on demand by ``DedupMail.load_body()``. The ``path`` of the mail is
+    looked up if not provided.
+    """
+    if headers_only:
+        mail = box._factory(read_headers(box, mail_id))
+        mail.headers_only = True
+    else:
+        mail = box[mail_id]
+    mail.add_box_metadata(box, mail_id, path)
+    return mail
 
 
 class DedupMail:
@@ -60,7 +122,8 @@ class DedupMail:
         # inherits from mailbox.Message.
         super(orig_message_klass, self).__init__(message)
 
-        # Normalized path to the mailbox this message originates from.
+        # Box this message originates from, and its normalized path.
+        self.box = None
         self.source_path = None
 
         # Mail ID used to uniquely refers to it in the context of its source.
@@ -75,7 +138,10 @@ class DedupMail:
         # Global config.
         self.conf = None
 
-    def add_box_metadata(self, box, mail_id):
+        # Set if the message was only instantiated from its headers.
+        self.headers_only = False
+
+    def add_box_metadata(self, box, mail_id, path=None):
         """Post-instantiation utility to attach to mail some metadata derived from its
         parent box.
 
@@ -83,13 +149,24 @@ class DedupMail:
 
         This allows the mail to carry its own information on its origin box and index.
         """
+        self.box = box
         self.source_path = box._path
         self.mail_id = mail_id
+        self.path = path if path else get_mail_path(box, mail_id)
 
-        # Extract file name and close it right away to reclaim memory.
-        mail_file = box.get_file(mail_id)
-        self.path = mail_file._file.name
-        mail_file.close()
+    def load_body(self):
+        """Complete a mail instantiated from its headers only with its body.
+
+        The full mail is fetched from its box, and its body transplanted into the
+        current instance. Does nothing if the body is already loaded.
+        """
+        if not self.headers_only:
+            return
+        logger.debug(f"Load body of {self!r}...")
+        full_mail = self.box[self.mail_id]
+        for attr_id in ("_payload", "preamble", "epilogue", "defects"):
+            setattr(self, attr_id, getattr(full_mail, attr_id))
+        self.headers_only = False
 
     def __repr__(self):
         return f"<{self.__class__.__name__} {self.source_path}:{self.mail_id}>"
@@ -106,14 +183,18 @@ class DedupMail:
         Sourced from the message's header by default. In the case of maildir,
         can be sourced from the email's file from the filesystem.
         """
+        return TIME_SOURCE_GETTERS[self.conf.time_source](self)
+
+    def ctime_timestamp(self):
+        """Timestamp of the mail's file from the filesystem."""
         # XXX ctime does not refer to creation time on POSIX systems, but
         # rather the last time the inode data changed. Source:
         # https://userprimary.net/posts/2007/11/18
         # /ctime-in-unix-means-last-change-time-not-create-time/
-        if self.conf.time_source == CTIME:
-            return os.path.getctime(self.path)
+        return os.path.getctime(self.path)
 
-        # Fetch from the date header.
+    def date_header_timestamp(self):
+        """Timestamp of the mail as found in its date header."""
         value = self.get("Date")
         try:
             value = email.utils.mktime_tz(email.utils.parsedate_tz(value))
@@ -132,15 +213,29 @@ class DedupMail:
         the mail stripped of all its headers, not from the mail file
         persisting on the file-system.
         """
-        return len("".join(self.body_lines))
+        return sum(map(len, self.body_lines))
 
         # TODO: Allow customization of the way the size is computed, by getting
         # the file size instead for example.
         # size = os.path.getsize(mail_file)
 
+    @cachedproperty
+    def body_fingerprint(self):
+        """Fast, non-cryptographic 64-bits hash of the normalized body.
+
+        Only used to cheaply tell apart identical bodies from different ones. Lines
+        are fed one by one to the hasher to not build the whole body in memory.
+        """
+        hasher = xxhash.xxh3_64()
+        for line in self.body_lines:
+            hasher.update(line.encode("utf-8", "surrogatepass"))
+        return hasher.intdigest()
+
     @cachedproperty
     def body_lines(self):
         """ Return a normalized list of lines from message's body. """
+        self.load_body()
+
         body = []
         if self.preamble is not None:
             body.extend(self.preamble.splitlines(keepends=True))
@@ -195,25 +290,35 @@ class DedupMail:
     def hash_key(self):
         """ Returns the canonical hash of a mail. """
         logger.debug(f"Serialized headers: {self.serialized_headers!r}")
-        hash_value = hashlib.sha224(self.serialized_headers).hexdigest()
+        hash_value = hashlib.blake2b(
+            self.serialized_headers, digest_size=HASH_DIGEST_SIZE
+        ).hexdigest()
         logger.debug(f"Hash: {hash_value}")
         return hash_value
 
     @cachedproperty
     def hash_raw_body(self):
-        """ Returns the canonical body hash of a mail. """
-        serialized_raw_body = "\n".join(self.body_lines).encode("utf-8")
-        hash_value = hashlib.sha224(serialized_raw_body).hexdigest()
+        """Returns the canonical body hash of a mail.
+
+        Lines are fed one by one to the hasher to not have to serialize the whole
+        body in memory.
+        """
+        hasher = hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+        for index, line in enumerate(self.body_lines):
+            if index:
+                hasher.update(b"\n")
+            hasher.update(line.encode("utf-8"))
+        hash_value = hasher.hexdigest()
         logger.debug(f"Body raw hash: {hash_value}")
         return hash_value
 
     @cachedproperty
     def hash_normalized_body(self):
         """ Returns the normalized body hash of a mail. """
-        serialized_normalized_body = "".join(
-            [re.sub(r"\s", "", l) for l in self.body_lines]
-        ).encode("utf-8")
-        hash_value = hashlib.sha224(serialized_normalized_body).hexdigest()
+        hasher = hashlib.blake2b(digest_size=HASH_DIGEST_SIZE)
+        for line in self.body_lines:
+            hasher.update(re.sub(r"\s", "", line).encode("utf-8"))
+        hash_value = hasher.hexdigest()
         logger.debug(f"Body normalized hash: {hash_value}")
         return hash_value
 
@@ -223,15 +328,21 @@ class DedupMail:
         preparation for hashing."""
         canonical_headers = []
 
+        # Fetch all occurrences of hashed headers in a single pass.
+        header_values = {}
+        for header_id, header_value in self.items():
+            header_id = header_id.lower()
+            if header_id in self.conf.hash_headers_set:
+                header_values.setdefault(header_id, []).append(header_value)
+
         for header_id in self.conf.hash_headers:
 
             # Skip absent header.
-            if header_id not in self:
+            if header_id not in header_values:
                 continue
 
-            # Fetch all occurrences of the header.
             canonical_values = []
-            for header_value in self.get_all(header_id):
+            for header_value in header_values[header_id]:
                 normalized_value = self.normalize_header_value(header_id, header_value)
                 if re.search(r"\S", normalized_value):
                     canonical_values.append(normalized_value)
@@ -342,3 +453,14 @@ class DedupMail:
                 return email.utils.unquote(value)
 
         return value
+
+
+# Mapping between time sources and the methods extracting a mail's timestamp.
+TIME_SOURCE_GETTERS = FrozenDict(
+    {
+        DATE_HEADER: DedupMail.date_header_timestamp,
+        CTIME: DedupMail.ctime_timestamp,
+    }
+)
+# Check we did not forgot any time source.
+assert set(TIME_SOURCE_GETTERS) == TIME_SOURCES
@@ -17,6 +17,7 @@
 
 import inspect
 import mailbox
+import os
 from functools import partial
 from pathlib import Path
 
@@ -126,13 +127,15 @@ def autodetect_box_type(path):
     return box_type
 
 
-def open_box(path, box_type=False, force_unlock=False):
+def open_box(path, box_type=False, force_unlock=False, recursive=True):
     """Open a mailbox.
 
     Returns a list of boxes, one per sub-folder. All are locked, ready for operations.
 
     If ``box_type`` is provided, forces the opening of the box in the specified format.
     Defaults to (crude) autodetection.
+
+    Sub-folders are only browsed if ``recursive`` is set.
     """
     logger.info(f"\nOpening {choice_style(path)} ...")
     path = Path(path)
@@ -145,7 +148,7 @@ def open_box(path, box_type=False, force_unlock=False):
     # Do not allow the constructor to create a new mailbox if not found.
     box = constructor(path, create=False)
 
-    return open_subfolders(box, force_unlock)
+    return open_subfolders(box, force_unlock, recursive)
 
 
 def lock_box(box, force_unlock):
@@ -172,18 +175,59 @@ def lock_box(box, force_unlock):
     return box
 
 
-def open_subfolders(box, force_unlock):
+def find_nested_maildirs(path):
+    """Search ``path`` for plain maildirs nested in regular folders.
+
+    Python's ``mailbox.Maildir`` only knows about subfolders following the Maildir++
+    layout, i.e. dot-prefixed folders at the root of the box. This walks the
+    directory tree with ``os.scandir`` to find all other folders featuring
+    the maildir sub-directories. Doesn't descend into the maildirs it yields, nor
+    follows symlinks.
+
+    Yields paths of all nested maildirs found. Unreadable folders are skipped.
+    """
+    try:
+        entries = os.scandir(path)
+    except OSError as expt:
+        logger.warning(f"Skip unreadable {path} folder: {expt}")
+        return
+    with entries:
+        for entry in entries:
+            # Skip the maildir structure itself and Maildir++ subfolders.
+            if entry.name in MAILDIR_SUBDIRS or entry.name.startswith("."):
+                continue
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            if all(
+                os.path.isdir(os.path.join(entry.path, subdir))
+                for subdir in MAILDIR_SUBDIRS
+            ):
+                yield entry.path
+            else:
+                yield from find_nested_maildirs(entry.path)
+
+
+def open_subfolders(box, force_unlock, recursive=True):
     """Browse recursively the subfolder tree of a box.
 
     Returns a list of opened and locked boxes, each for one subfolder.
     """
     folder_list = [lock_box(box, force_unlock)]
 
+    if not recursive:
+        return folder_list
+
     # Skip box types not supporting subfolders.
     if hasattr(box, "list_folders"):
         for folder_id in box.list_folders():
             logger.info(f"Opening subfolder {folder_id} ...")
             folder_list += open_subfolders(box.get_folder(folder_id), force_unlock)
+
+    if isinstance(box, mailbox.Maildir):
+        for folder_path in find_nested_maildirs(box._path):
+            logger.info(f"Opening nested maildir {folder_path} ...")
+            folder = BOX_TYPES["maildir"](folder_path)
+            folder_list += open_subfolders(folder, force_unlock)
     return folder_list
 
 
@@ -18,7 +18,6 @@
 """ Strategy definitions. """
 
 import random
-import re
 
 from boltons.dictutils import FrozenDict
 
@@ -144,7 +143,7 @@ def select_matching_path(duplicates):
         f"{duplicates.conf.regexp.pattern} regexp..."
     )
     return {
-        mail for mail in duplicates.pool if re.search(duplicates.conf.regexp, mail.path)
+        mail for mail in duplicates.pool if duplicates.conf.regexp.search(mail.path)
     }
 
 
@@ -157,9 +156,7 @@ def select_non_matching_path(duplicates):
         f"{duplicates.conf.regexp.pattern} regexp..."
     )
     return {
-        mail
-        for mail in duplicates.pool
-        if not re.search(duplicates.conf.regexp, mail.path)
+        mail for mail in duplicates.pool if not duplicates.conf.regexp.search(mail.path)
     }
 
 
@@ -52,11 +52,16 @@ def print_cli_output(cmd, output):
         print(indent(output, "  "))
 
 
+@pytest.fixture(scope="session")
+def shared_runner():
+    """ Click's runner invokes the CLI in-process and is shared by all tests. """
+    return CliRunner()
+
+
 @pytest.fixture
-def runner():
-    runner = CliRunner()
-    with runner.isolated_filesystem():
-        yield runner
+def runner(shared_runner):
+    with shared_runner.isolated_filesystem():
+        yield shared_runner
 
 
 @pytest.fixture
@@ -0,0 +1,88 @@
+# Copyright Kevin Deldycke <kevin@deldycke.com> and contributors.
+# All Rights Reserved.
+#
+# This program is Free Software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+import os
+import re
+from mailbox import Maildir
+
+import pytest
+
+from .. import Config
+from .. import cache as cache_module
+from ..cache import Cache
+from .conftest import MailFactory
+
+
+def test_cache_invalidation(tmp_path):
+    mail_file = tmp_path.joinpath("mail")
+    mail_file.write_text("Hello")
+    db_path = tmp_path.joinpath("cache", "hashes.sqlite")
+
+    with Cache(db_path, Config()) as cache:
+        key = cache.key(mail_file, 0)
+        assert cache.get(key) is None
+        cache.set(key, "abcdef")
+        assert cache.get(key) == "abcdef"
+        # Other mails of the same file are not affected.
+        assert cache.get(cache.key(mail_file, 1)) is None
+
+    # Hashes are persisted.
+    with Cache(db_path, Config()) as cache:
+        assert cache.get(cache.key(mail_file, 0)) == "abcdef"
+
+    # Hashes computed with other settings are ignored.
+    with Cache(db_path, Config(hash_headers=("From", "To"))) as cache:
+        assert cache.get(cache.key(mail_file, 0)) is None
+
+    # Modified files are ignored.
+    mail_file.write_text("Hello World")
+    with Cache(db_path, Config()) as cache:
+        assert cache.get(cache.key(mail_file, 0)) is None
+
+
+def test_cache_release_invalidation(tmp_path, monkeypatch):
+    mail_file = tmp_path.joinpath("mail")
+    mail_file.write_text("Hello")
+    db_path = tmp_path.joinpath("hashes.sqlite")
+
+    with Cache(db_path, Config()) as cache:
+        cache.set(cache.key(mail_file, 0), "abcdef")
+
+    # Hashes computed by another release are ignored.
+    monkeypatch.setattr(cache_module, "__version__", "999.0.0")
+    with Cache(db_path, Config()) as cache:
+        assert cache.get(cache.key(mail_file, 0)) is None
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_cache_reuse(invoke, make_box, jobs):
+    box_path, _ = make_box(
+        Maildir,
+        [MailFactory(body="foo"), MailFactory(body="bar"), MailFactory(body="bar")],
+    )
+    cache_path = "cache.sqlite"
+    options = (f"--jobs={jobs}", f"--cache-path={cache_path}", "--dry-run")
+
+    result = invoke(*options, "--action=delete-selected", box_path)
+    assert result.exit_code == 0
+    assert "0 hashes fetched from cache." in result.output
+    assert os.path.isfile(cache_path)
+
+    result = invoke(*options, "--action=delete-selected", box_path)
+    assert result.exit_code == 0
+    assert "3 hashes fetched from cache." in result.output
+    assert re.search(r"Cached\s+│\s+3 ", result.output)
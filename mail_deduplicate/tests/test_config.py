@@ -0,0 +1,116 @@
+# Copyright Kevin Deldycke <kevin@deldycke.com> and contributors.
+# All Rights Reserved.
+#
+# This program is Free Software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
+
+from mailbox import Maildir
+
+import pytest
+
+from .. import (
+    _DEFAULT_NORMALIZED_HEADERS,
+    CTIME,
+    DATE_HEADER,
+    HASH_HEADERS,
+    HASH_HEADERS_SET,
+    Config,
+    cli,
+    normalize_header_id,
+)
+from ..deduplicate import BODY_HASHER_SKIP, BODY_HASHERS
+
+
+def test_default_hash_headers():
+    conf = Config()
+    assert conf.hash_headers == tuple(h.lower() for h in HASH_HEADERS)
+    assert conf.hash_headers_set == HASH_HEADERS_SET
+
+
+def test_cli_default_hash_headers(invoke, make_box, monkeypatch):
+    """ Default headers passed by the CLI are not normalized again. """
+    confs = []
+
+    class RecordingDeduplicate(cli.Deduplicate):
+        def __init__(self, conf):
+            confs.append(conf)
+            super().__init__(conf)
+
+    monkeypatch.setattr(cli, "Deduplicate", RecordingDeduplicate)
+    box_path, _ = make_box(Maildir)
+    result = invoke("--strategy=select-oldest", "--action=delete-selected", box_path)
+    assert result.exit_code == 0
+    (conf,) = confs
+    assert conf.hash_headers is _DEFAULT_NORMALIZED_HEADERS
+    assert conf.hash_headers_set is HASH_HEADERS_SET
+
+
+def test_hash_headers_normalization():
+    conf = Config(hash_headers=("From", "Subject", "fRoM", "X-Priority"))
+    assert conf.hash_headers == ("from", "subject", "x-priority")
+    assert conf.hash_headers_set == {"from", "subject", "x-priority"}
+
+
+@pytest.mark.parametrize("header_id", ["", "Sub ject", "Subject:\n", "Sübject"])
+def test_invalid_hash_headers(header_id):
+    with pytest.raises(ValueError):
+        Config(hash_headers=("From", header_id))
+
+
+def test_all_options_set():
+    conf = Config()
+    for option_id, default_value in Config.default_conf.items():
+        assert getattr(conf, option_id) == default_value
+
+
+def test_default_conf_read_only():
+    with pytest.raises(TypeError):
+        Config.default_conf["dry_run"] = True
+    conf = Config(dry_run=True)
+    assert conf.dry_run is True
+    assert Config.default_conf["dry_run"] is False
+    assert Config().dry_run is False
+
+
+def test_regexp_compilation():
+    assert Config().regexp is None
+    conf = Config(regexp=r"\.sent$")
+    assert conf.regexp.search("/mails/foo.sent")
+    assert not conf.regexp.search("/mails/foo.sent.bak")
+
+
+def test_unknown_option():
+    with pytest.raises(ValueError):
+        Config(foo=True)
+    with pytest.raises(AttributeError):
+        getattr(Config(), "foo")
+
+
+def test_default_hash_body_hasher():
+    conf = Config()
+    assert conf.hash_body in BODY_HASHERS
+    assert conf.hash_body == BODY_HASHER_SKIP
+
+
+def test_normalize_header_id():
+    assert normalize_header_id("Message-ID") == "message-id"
+    assert normalize_header_id("message-id") is normalize_header_id("MESSAGE-ID")
+
+
+def test_time_source():
+    assert Config().time_source == DATE_HEADER
+    assert Config(time_source=None).time_source == DATE_HEADER
+    assert Config(time_source=CTIME).time_source == CTIME
+    with pytest.raises(AssertionError):
+        Config(time_source="mtime")
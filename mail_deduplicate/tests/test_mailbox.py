@@ -15,8 +15,15 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
 
+import os
+from mailbox import Maildir
+from pathlib import Path
+
 import pytest
 
+from .. import mailbox as mailbox_module
+from .conftest import MailFactory
+
 
 @pytest.mark.parametrize("source", ["./dummy_maildir/", "./__init__.py"])
 def test_nonexistent_path(invoke, source):
@@ -31,3 +38,56 @@ def test_invalid_maildir_structure(invoke):
     assert "Phase #0" in result.output
     assert "Opening " in result.output
     assert "Missing sub-directory" in str(result.exc_info[1])
+
+
+@pytest.mark.parametrize("recursive", [True, False])
+def test_nested_maildir(invoke, make_box, recursive):
+    """Maildirs nested in regular folders are browsed as subfolders."""
+    mail = MailFactory()
+    box_path, _ = make_box(Maildir, [mail])
+
+    # Non-maildir folder holding a maildir.
+    Path(box_path, "archives").mkdir()
+    nested_box = Maildir(Path(box_path, "archives", "2021"), create=True)
+    nested_box.add(mail.render())
+    nested_box.add(mail.render())
+    nested_box.close()
+
+    result = invoke(
+        "--recursive" if recursive else "--no-recursive",
+        "--dry-run",
+        "--action=delete-selected",
+        box_path,
+    )
+
+    assert result.exit_code == 0
+    assert "1 mails found." in result.output
+    if recursive:
+        assert "Opening nested maildir " in result.output
+        assert "2 mails found." in result.output
+    else:
+        assert "Opening nested maildir " not in result.output
+        assert "2 mails found." not in result.output
+
+
+def test_unreadable_nested_folder(invoke, make_box, monkeypatch):
+    """Unreadable regular folders are skipped on nested maildirs search."""
+    mail = MailFactory()
+    box_path, _ = make_box(Maildir, [mail])
+    unreadable_path = Path(box_path, "private")
+    unreadable_path.mkdir()
+
+    original_scandir = os.scandir
+
+    def scandir(path):
+        if Path(path) == unreadable_path:
+            raise PermissionError(13, "Permission denied", str(path))
+        return original_scandir(path)
+
+    monkeypatch.setattr(mailbox_module.os, "scandir", scandir)
+
+    result = invoke("--dry-run", "--action=delete-selected", box_path)
+
+    assert result.exit_code == 0
+    assert f"Skip unreadable {unreadable_path} folder" in result.output
+    assert "1 mails found." in result.output
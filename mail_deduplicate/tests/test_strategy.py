@@ -15,12 +15,15 @@
 # along with this program; if not, write to the Free Software
 # Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA  02111-1307, USA.
 
-from mailbox import Maildir
+from mailbox import Maildir, mbox
 from string import ascii_lowercase
 
 import arrow
+import click
 import pytest
 
+from .. import Config
+from ..deduplicate import BODY_HASHERS, Deduplicate
 from ..strategy import (
     STRATEGY_METHODS,
     DISCARD_OLDER,
@@ -150,6 +153,120 @@ def test_maildir_smaller_strategy(invoke, make_box, strategy_id):
     )
 
 
+# Same size as smallest_mail, but another content.
+uppercase_mail = MailFactory(body="Hello I am a duplicate mail. With annoying ĆĤÄŖŞ.")
+
+
+@pytest.mark.parametrize(
+    "mails,options,message",
+    [
+        (
+            [smallest_mail, smaller_mail, biggest_mail],
+            ["--size-threshold=0"],
+            "too dissimilar in size",
+        ),
+        (
+            [smallest_mail, smaller_mail, biggest_mail],
+            ["--size-threshold=-1", "--content-threshold=0"],
+            "too dissimilar in content",
+        ),
+        (
+            [smallest_mail, uppercase_mail],
+            ["--size-threshold=0", "--content-threshold=3"],
+            "too dissimilar in content",
+        ),
+    ],
+)
+def test_maildir_threshold_skip(invoke, make_box, mails, options, message):
+    """ Sets of mails beyond thresholds are skipped. """
+    box_path, box_type = make_box(Maildir, mails)
+
+    result = invoke(
+        *options, f"--strategy={SELECT_SMALLEST}", "--action=delete-selected", box_path
+    )
+
+    assert result.exit_code == 0
+    assert message in result.output
+    check_box(box_path, box_type, content=mails)
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 3])
+def test_parallel_hashing(invoke, make_box, jobs):
+    """ Mails hashed by worker processes are grouped the same way. """
+    box_path, box_type = make_box(
+        Maildir,
+        [
+            smallest_mail,
+            biggest_mail,
+            smallest_mail,
+            bigger_mail,
+            smaller_mail,
+            smaller_mail,
+            bigger_mail,
+            biggest_mail,
+        ],
+    )
+
+    result = invoke(
+        f"--jobs={jobs}",
+        f"--strategy={SELECT_SMALLER}",
+        "--action=delete-selected",
+        box_path,
+    )
+
+    assert result.exit_code == 0
+    check_box(
+        box_path,
+        box_type,
+        content=[biggest_mail, biggest_mail],
+    )
+
+
+def test_file_box_hashed_in_main_process(make_box):
+    """ Mails from file-based boxes are never sent to worker processes. """
+    box_path, _ = make_box(mbox, [smallest_mail, biggest_mail, smallest_mail])
+
+    class UnusedExecutor:
+        def map(self, *args):
+            raise AssertionError("File-based box sent to worker processes.")
+
+    conf = Config(jobs=2)
+    dedup = Deduplicate(conf)
+    dedup.add_source(box_path)
+    (box,) = dedup.sources.values()
+    hashes = [
+        mail_hash
+        for _, mail_hash in dedup.iter_hashes(
+            box, BODY_HASHERS[conf.hash_body], UnusedExecutor()
+        )
+    ]
+    dedup.close_all()
+    assert len(hashes) == 3
+    assert len(set(hashes)) == 1
+
+
+def test_hashing_progress_completion(make_box, monkeypatch):
+    """ Progress bar ends on the total of mails even if not redrawn on each one. """
+    box_path, _ = make_box(Maildir, [smallest_mail, biggest_mail, smallest_mail])
+
+    progress_bars = []
+    original_progressbar = click.progressbar
+
+    def progressbar(**kwargs):
+        kwargs["update_min_steps"] = 2
+        progress_bars.append(original_progressbar(**kwargs))
+        return progress_bars[-1]
+
+    monkeypatch.setattr(click, "progressbar", progressbar)
+
+    dedup = Deduplicate(Config())
+    dedup.add_source(box_path)
+    dedup.hash_all()
+    dedup.close_all()
+    (progress,) = progress_bars
+    assert progress.pos == 3
+
+
 @pytest.mark.parametrize("strategy_id", [SELECT_SMALLEST, DISCARD_BIGGER])
 def test_maildir_smallest_strategy(invoke, make_box, strategy_id):
     """ Test strategy of smallest mail selection. """
@@ -386,6 +503,35 @@ def test_maildir_newest_strategy(invoke, make_box, strategy_id):
     )
 
 
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_maildir_headers_only_copy(invoke, make_box, tmp_path, jobs):
+    """Mails loaded without their body can be selected on time and are copied whole."""
+    box_path, box_type = make_box(
+        Maildir,
+        [oldest_mail, newest_mail, newer_mail, newest_mail],
+    )
+    export_path = str(tmp_path.joinpath("export"))
+
+    result = invoke(
+        f"--jobs={jobs}",
+        "--size-threshold=-1",
+        "--content-threshold=-1",
+        f"--strategy={SELECT_NEWEST}",
+        "--action=copy-selected",
+        f"--export={export_path}",
+        "--export-format=maildir",
+        box_path,
+    )
+
+    assert result.exit_code == 0
+    check_box(
+        box_path,
+        box_type,
+        content=[oldest_mail, newest_mail, newer_mail, newest_mail],
+    )
+    check_box(export_path, Maildir, content=[newest_mail, newest_mail])
+
+
 random_mail_1 = MailFactory(message_id=MailFactory.random_string(30))
 random_mail_2 = MailFactory(message_id=MailFactory.random_string(30))
 